@@ -3,19 +3,44 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import os
+import sys
 import csv
+import json
+import math
+import struct
 import asyncio
 import uuid
+import codecs
+import io
+import hashlib
+import mmap
+import shutil
+import time
+import threading
+import multiprocessing
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from bisect import bisect_left, bisect_right
 from pathlib import Path
 from datetime import date, datetime, timedelta, timezone
 from typing import Any, Dict, Iterable, List, Optional
 
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
 import truststore
 truststore.inject_into_ssl()
 
 import httpx
-from fastapi import Body, FastAPI, HTTPException
+import websockets
+from fastapi import Body, FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 
 # =========================
@@ -29,6 +54,7 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-CSV-Used"],
 )
 
 # =========================
@@ -38,6 +64,8 @@ EXPORT_DIR = Path(__file__).resolve().parent / "exports"
 EXPORT_DIR.mkdir(exist_ok=True)
 # Stop-Flag für laufenden Coinbase-Export
 EXPORT_STOP_REQUESTED = False
+# Importierte Historie (gleiches Schema wie der Export, überlebt neue Exporte)
+IMPORT_PATH = EXPORT_DIR / "imported_daily.csv"
 
 
 # =========================
@@ -450,23 +478,48 @@ def latest_coinbase_csv() -> Path:
     return files[0]
 
 
+def latest_prices_csv() -> Path:
+    """
+    Datenquelle für alle Preis-Leser: die neueste Coinbase-CSV (+ Importe),
+    ohne Export nur die importierte Historie.
+    """
+    try:
+        return latest_coinbase_csv()
+    except HTTPException:
+        if IMPORT_PATH.exists():
+            return IMPORT_PATH
+        raise HTTPException(status_code=404, detail="Keine Coinbase-CSV und keine importierten Daten gefunden")
+
+
 def load_prices_by_symbol(csv_path: Path) -> dict[str, list[tuple[datetime, float]]]:
     """
     Lädt CSV und gruppiert Preise nach Symbol.
     Rückgabe: { "BTC": [(date, price), ...], ... }
     """
     data: dict[str, list[tuple[datetime, float]]] = {}
+    # dieselben Tage kommen bei jedem Symbol vor -> Datum nur einmal parsen
+    days: dict[str, date] = {}
 
     with open(csv_path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
+        reader = csv.reader(f)
+        header = next(reader, [])
+        try:
+            i_sym, i_date, i_close = header.index("symbol"), header.index("date_utc"), header.index("close_usd")
+        except ValueError:
+            return data
+        i_err = header.index("error") if "error" in header else None
+
         for row in reader:
-            if row.get("error"):
-                continue
             try:
-                sym = row["symbol"]
-                date = datetime.fromisoformat(row["date_utc"]).date()
-                price = float(row["close_usd"])
-                data.setdefault(sym, []).append((date, price))
+                if i_err is not None and row[i_err]:
+                    continue
+                sym = row[i_sym]
+                raw_day = row[i_date]
+                day = days.get(raw_day)
+                if day is None:
+                    day = days[raw_day] = datetime.fromisoformat(raw_day).date()
+                price = float(row[i_close])
+                data.setdefault(sym, []).append((day, price))
             except Exception:
                 continue
 
@@ -476,6 +529,197 @@ def load_prices_by_symbol(csv_path: Path) -> dict[str, list[tuple[datetime, floa
 
     return data
 
+
+PRICE_CACHE_DIR = EXPORT_DIR / "cache"
+PRICE_STORE_MAGIC = b"TBP1"
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+_price_store_cache: dict[str, Any] = {"key": None, "store": None}
+
+
+def csv_version(csv_path: Path) -> tuple[str, int, int]:
+    st = csv_path.stat()
+    return (str(csv_path), st.st_mtime_ns, st.st_size)
+
+
+def prices_version(csv_path: Path) -> tuple[Any, ...]:
+    """
+    Version der Preisdaten: Export-CSV + ggf. importierte Historie.
+    """
+    imported = csv_version(IMPORT_PATH) if csv_path != IMPORT_PATH and IMPORT_PATH.exists() else None
+    return (csv_version(csv_path), imported)
+
+
+def load_merged_prices(csv_path: Path) -> dict[str, list[tuple[date, float]]]:
+    """
+    Export-CSV + importierte Historie; bei gleichem (Symbol, Tag) gewinnt der Export.
+    """
+    data = load_prices_by_symbol(csv_path)
+    if csv_path != IMPORT_PATH and IMPORT_PATH.exists():
+        for sym, rows in load_prices_by_symbol(IMPORT_PATH).items():
+            have = {d for d, _ in data.get(sym, ())}
+            extra = [(d, p) for d, p in rows if d not in have]
+            if extra:
+                data[sym] = sorted(data.get(sym, []) + extra, key=lambda x: x[0])
+    return data
+
+
+class PriceStore:
+    """
+    Read-only Preisdaten aller Symbole in Spaltenform, per mmap aus einer Cache-Datei.
+    Alle Prozesse (API + Compute-Worker) teilen sich dieselben Seiten im Page-Cache.
+    days = int32 Tage seit 1970-01-01, prices = float64; spans[sym] = (lo, hi),
+    innerhalb eines Symbols nach Datum sortiert.
+    """
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mm)
+        n_rows, index_len = struct.unpack_from("<II", buf, 4)
+        self.spans: dict[str, tuple[int, int]] = {
+            sym: (lo, hi) for sym, (lo, hi) in json.loads(bytes(buf[12:12 + index_len])).items()
+        }
+        off = 12 + index_len
+        off += -off % 8
+        self.days = buf[off:off + 4 * n_rows].cast("i")
+        off += 4 * n_rows
+        off += -off % 8
+        self.prices = buf[off:off + 8 * n_rows].cast("d")
+
+    def rows(self, symbol: str, start: Optional[date] = None, end: Optional[date] = None) -> list[tuple[date, float]]:
+        """
+        [(date, price), ...] eines Symbols, optional auf [start, end] begrenzt.
+        """
+        span = self.spans.get(symbol)
+        if not span:
+            return []
+        lo, hi = span
+        if start:
+            lo = bisect_left(self.days, start.toordinal() - _EPOCH_ORDINAL, lo, hi)
+        if end:
+            hi = bisect_right(self.days, end.toordinal() - _EPOCH_ORDINAL, lo, hi)
+        return [
+            (date.fromordinal(_EPOCH_ORDINAL + d), p)
+            for d, p in zip(self.days[lo:hi], self.prices[lo:hi])
+        ]
+
+
+def _write_price_store(path: Path, data: dict[str, list[tuple[date, float]]]):
+    days = array("i")
+    prices = array("d")
+    spans: dict[str, tuple[int, int]] = {}
+    for sym, rows in data.items():
+        lo = len(days)
+        days.extend(d.toordinal() - _EPOCH_ORDINAL for d, _ in rows)
+        prices.extend(p for _, p in rows)
+        spans[sym] = (lo, len(days))
+
+    index = json.dumps(spans).encode("utf-8")
+    head = PRICE_STORE_MAGIC + struct.pack("<II", len(days), len(index)) + index
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(head + b"\0" * (-len(head) % 8))
+        f.write(days.tobytes())
+        f.write(b"\0" * (-(4 * len(days)) % 8))
+        f.write(prices.tobytes())
+    os.replace(tmp, path)
+
+
+def _lock_file(f, shared: bool, blocking: bool) -> bool:
+    if fcntl is not None:
+        flags = (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | (0 if blocking else fcntl.LOCK_NB)
+        try:
+            fcntl.flock(f, flags)
+        except BlockingIOError:
+            return False
+        return True
+
+    # Windows: nur exklusive Locks; LK_LOCK gibt nach ~10 s auf -> wiederholen
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def _file_lock(path: Path, shared: bool = False):
+    """
+    Prozessübergreifender Lock auf einer Lock-Datei (blockierend).
+    """
+    with open(path, "a+b") as f:
+        _lock_file(f, shared, blocking=True)
+        try:
+            yield
+        finally:
+            _unlock_file(f)
+
+
+def _cleanup_price_stores(keep: Path):
+    """
+    Löscht alte Versionen, aber nur, wenn gerade kein Prozess sie öffnet/baut
+    (Lock nicht blockierend). Bereits gemappte Dateien bleiben für ihre Leser gültig.
+    """
+    for lock_path in PRICE_CACHE_DIR.glob("prices_*.lock"):
+        bin_path = lock_path.with_suffix(".bin")
+        if bin_path == keep:
+            continue
+        try:
+            with open(lock_path, "a+b") as f:
+                if not _lock_file(f, shared=False, blocking=False):
+                    continue
+                try:
+                    bin_path.unlink(missing_ok=True)
+                finally:
+                    _unlock_file(f)
+            lock_path.unlink(missing_ok=True)
+        except OSError:
+            # unter Windows evtl. noch gemappt -> beim nächsten Mal
+            pass
+
+
+def price_store(csv_path: Path) -> PriceStore:
+    """
+    PriceStore zur aktuellen Datenversion. Die Cache-Datei wird pro Version nur von
+    einem Prozess gebaut (exklusiver Lock auf prices_<hash>.lock); alle anderen warten
+    darauf und mappen dann nur noch.
+    """
+    key = prices_version(csv_path)
+    if _price_store_cache["key"] == key:
+        return _price_store_cache["store"]
+
+    PRICE_CACHE_DIR.mkdir(exist_ok=True)
+    path = PRICE_CACHE_DIR / f"prices_{hashlib.sha1(repr(key).encode()).hexdigest()[:16]}.bin"
+    lock_path = path.with_suffix(".lock")
+
+    store = None
+    with _file_lock(lock_path, shared=True):
+        if path.exists():
+            store = PriceStore(path)
+
+    if store is None:
+        with _file_lock(lock_path):
+            if not path.exists():
+                _write_price_store(path, load_merged_prices(csv_path))
+            store = PriceStore(path)
+        _cleanup_price_stores(keep=path)
+
+    _price_store_cache["key"] = key
+    _price_store_cache["store"] = store
+    return store
+
 def calc_ma_for_date(target_date: date, rows, ma_days: int) -> float | None:
     """
     Berechnet den gleitenden Durchschnitt relativ zu einem Ziel-Datum.
@@ -494,38 +738,172 @@ def months_between(start: date, end: date) -> int:
     return (end.year - start.year) * 12 + (end.month - start.month)
 
 
+# =========================
+# Compute-Pool: CPU-lastige Endpoints laufen in eigenen Prozessen
+# =========================
+def _available_cpus() -> int:
+    """
+    CPUs, die dieser Prozess wirklich nutzen darf: CPU-Affinität und ggf. cgroup-Quota
+    (Container) statt os.cpu_count(), das immer alle Kerne des Hosts meldet.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # Windows/macOS
+        cpus = os.cpu_count() or 2
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS") or max(2, min(_available_cpus(), 8)))
+COMPUTE_QUEUE_MAX = int(os.getenv("COMPUTE_QUEUE_MAX", "16"))
+COMPUTE_RETRY_AFTER = int(os.getenv("COMPUTE_RETRY_AFTER", "2"))
+
+# Gruppen im Prozess-Pool: die Anteile summieren sich auf COMPUTE_WORKERS,
+# damit jede Gruppe ihre Worker wirklich reserviert hat
+_filter_share = max(1, COMPUTE_WORKERS // 2)
+COMPUTE_LIMITS = {
+    "filter": int(os.getenv("COMPUTE_LIMIT_FILTER") or _filter_share),
+    "simulate": int(os.getenv("COMPUTE_LIMIT_SIMULATE") or max(1, COMPUTE_WORKERS - _filter_share)),
+}
+# Gruppen, die nur Slices aus dem gemappten PriceStore schneiden: laufen in Threads
+# im API-Prozess und belegen keine Pool-Worker
+COMPUTE_THREAD_LIMITS = {
+    "history": int(os.getenv("COMPUTE_LIMIT_HISTORY") or 4),
+    "analytics": int(os.getenv("COMPUTE_LIMIT_ANALYTICS") or 2),
+}
+
+_compute_pool: dict[str, Any] = {"executor": None}
+
+
+def _compute_worker_init():
+    """
+    Mappt die Preisdaten einmal pro Worker vor (read-only, geteilt über den Page-Cache).
+    """
+    try:
+        price_store(latest_prices_csv())
+    except Exception:
+        pass
+
+
+def _get_compute_executor() -> ProcessPoolExecutor:
+    if _compute_pool["executor"] is None:
+        _compute_pool["executor"] = ProcessPoolExecutor(
+            max_workers=COMPUTE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_compute_worker_init,
+        )
+    return _compute_pool["executor"]
 
-#-------- Filter Endpoints ------------------------------------
-@app.post("/api/filter/coinbase")
-def filter_coinbase(payload: Dict[str, Any] = Body(...)):
+
+_compute_threads = ThreadPoolExecutor(
+    max_workers=sum(COMPUTE_THREAD_LIMITS.values()),
+    thread_name_prefix="compute",
+)
+
+
+class ComputeGate:
     """
-    Filtert Coins aus der neuesten Coinbase-CSV anhand:
-    - years
-    - percent
-    - direction (gestiegen / gefallen)
+    Admission Control pro Endpoint-Gruppe: höchstens `limit` Jobs laufen,
+    höchstens `queue_max` warten. Alles darüber -> sofort 503 mit Retry-After.
+    Mit `in_process=True` laufen die Jobs in Threads des API-Prozesses statt im Pool.
     """
-    years = float(payload.get("years", 3))
-    percent = float(payload.get("percent", 20))
-    direction = payload.get("direction", "gestiegen")
 
+    def __init__(self, name: str, limit: int, queue_max: int, in_process: bool = False):
+        self.name = name
+        self.limit = limit
+        self.in_process = in_process
+        self.queue_max = queue_max
+        self.sem = asyncio.Semaphore(limit)
+        self.pending = 0  # laufend + wartend
+        self.rejected = 0
+
+    async def run(self, fn, *args):
+        if self.pending >= self.limit + self.queue_max:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail=f"Rechenkapazität für {self.name} ausgelastet, bitte später erneut versuchen",
+                headers={"Retry-After": str(COMPUTE_RETRY_AFTER)},
+            )
+
+        self.pending += 1
+        try:
+            async with self.sem:
+                loop = asyncio.get_running_loop()
+                if self.in_process:
+                    return await loop.run_in_executor(_compute_threads, fn, *args)
+
+                executor = _get_compute_executor()
+                try:
+                    return await loop.run_in_executor(executor, fn, *args)
+                except BrokenProcessPool:
+                    # abgestürzter Worker -> Pool beim nächsten Aufruf neu aufbauen,
+                    # aber nur, wenn nicht schon ein anderer Request das getan hat
+                    if _compute_pool["executor"] is executor:
+                        _compute_pool["executor"] = None
+                        executor.shutdown(wait=False, cancel_futures=True)
+                    raise HTTPException(
+                        status_code=503,
+                        detail="Compute-Worker neu gestartet, bitte erneut versuchen",
+                        headers={"Retry-After": str(COMPUTE_RETRY_AFTER)},
+                    )
+        finally:
+            self.pending -= 1
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "mode": "thread" if self.in_process else "process",
+            "limit": self.limit,
+            "queue_max": self.queue_max,
+            "running": min(self.pending, self.limit),
+            "queued": max(0, self.pending - self.limit),
+            "rejected": self.rejected,
+        }
+
+
+_compute_gates = {
+    **{name: ComputeGate(name, limit, COMPUTE_QUEUE_MAX) for name, limit in COMPUTE_LIMITS.items()},
+    **{
+        name: ComputeGate(name, limit, COMPUTE_QUEUE_MAX, in_process=True)
+        for name, limit in COMPUTE_THREAD_LIMITS.items()
+    },
+}
+
+
+@app.get("/api/compute/status")
+def compute_status():
+    return {
+        "workers": COMPUTE_WORKERS,
+        "gates": {name: gate.status() for name, gate in _compute_gates.items()},
+    }
+
+
+
+#-------- Filter Endpoints ------------------------------------
+def _filter_coinbase_compute(csv_path: Path, years: float, percent: float, direction: str) -> list[dict[str, Any]]:
     today = datetime.utcnow().date()
     days = int(365 * years)
     start_date = today - timedelta(days=days)
 
-    csv_path = latest_coinbase_csv()
-    prices_by_symbol = load_prices_by_symbol(csv_path)
+    store = price_store(csv_path)
+    start_day = start_date.toordinal() - _EPOCH_ORDINAL
 
     results = []
 
-    for symbol, rows in prices_by_symbol.items():
+    for symbol, (lo, hi) in store.spans.items():
         # Preise im Zeitraum
-        in_range = [(d, p) for d, p in rows if d >= start_date]
+        first = bisect_left(store.days, start_day, lo, hi)
 
-        if len(in_range) < 2:
+        if hi - first < 2:
             continue
 
-        start_price = in_range[0][1]
-        end_price = in_range[-1][1]
+        start_price = store.prices[first]
+        end_price = store.prices[hi - 1]
 
         if start_price <= 0:
             continue
@@ -551,6 +929,24 @@ def filter_coinbase(payload: Dict[str, Any] = Body(...)):
             "period": period,
         })
 
+    return results
+
+
+@app.post("/api/filter/coinbase")
+async def filter_coinbase(payload: Dict[str, Any] = Body(...)):
+    """
+    Filtert Coins aus der neuesten Coinbase-CSV anhand:
+    - years
+    - percent
+    - direction (gestiegen / gefallen)
+    """
+    years = float(payload.get("years", 3))
+    percent = float(payload.get("percent", 20))
+    direction = payload.get("direction", "gestiegen")
+
+    csv_path = latest_prices_csv()
+    results = await _compute_gates["filter"].run(_filter_coinbase_compute, csv_path, years, percent, direction)
+
     return {
         "count": len(results),
         "results": results,
@@ -558,16 +954,8 @@ def filter_coinbase(payload: Dict[str, Any] = Body(...)):
     }
 
 
-@app.get("/api/csv/history/{symbol}")
-def csv_history(symbol: str):
-    """
-    Liefert Zeitverlauf (date, close) eines Coins aus der neuesten CSV.
-    """
-    symbol = symbol.upper()
-    csv_path = latest_coinbase_csv()
-    prices_by_symbol = load_prices_by_symbol(csv_path)
-
-    rows = prices_by_symbol.get(symbol)
+def _csv_history_compute(csv_path: Path, symbol: str) -> dict[str, Any]:
+    rows = price_store(csv_path).rows(symbol)
     if not rows:
         return {
             "symbol": symbol,
@@ -585,27 +973,148 @@ def csv_history(symbol: str):
         "labels": labels,
         "data": data,
     }
-#-------Sparplan----------
-@app.post("/api/simulate/savings")
-def simulate_savings(payload: Dict[str, Any] = Body(...)):
+
+
+@app.get("/api/csv/history/{symbol}")
+async def csv_history(symbol: str):
     """
-    Simuliert einen monatlichen Sparplan (DCA) auf Basis der neuesten CSV.
-    Regeln:
-    - Kauf NUR am 1. des Monats
-    - Fehlt der 1. -> Monat wird übersprungen
-    - Keine Gebühren
+    Liefert Zeitverlauf (date, close) eines Coins aus der neuesten CSV.
     """
-    symbol = payload.get("symbol", "").upper()
-    years = float(payload.get("years", 1))
-    monthly_usd = float(payload.get("monthly_usd", 0))
+    csv_path = latest_prices_csv()
+    return await _compute_gates["history"].run(_csv_history_compute, csv_path, symbol.upper())
+
+
+HISTORY_BATCH_MAX_SYMBOLS = 200
+HISTORY_BINARY_MAGIC = b"TBH1"
+
+
+def _parse_iso_day(value: Optional[str], name: str) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} muss ein Datum im Format YYYY-MM-DD sein")
 
-    if not symbol or monthly_usd <= 0:
-        raise HTTPException(status_code=400, detail="Ungültige Parameter")
 
-    # CSV laden
-    csv_path = latest_coinbase_csv()
-    prices_by_symbol = load_prices_by_symbol(csv_path)
-    rows = prices_by_symbol.get(symbol)
+def _encode_history_binary(symbols: list[str], labels: list[date], columns: list[array]) -> bytes:
+    """
+    Kompaktes Binärformat (alles little-endian):
+    - 4 Bytes Magic "TBH1"
+    - uint32 n_dates, uint32 n_series, uint32 names_len
+    - names_len Bytes UTF-8: Symbole, komma-getrennt
+    - Null-Bytes bis zur nächsten 4-Byte-Grenze
+    - n_dates x int32: Tage seit 1970-01-01
+    - Null-Bytes bis zur nächsten 8-Byte-Grenze
+    - n_series x n_dates x float64 (pro Symbol eine Spalte, NaN = kein Wert)
+    Die Paddings erlauben im Browser direkte Int32Array/Float64Array-Views.
+    """
+    names = ",".join(symbols).encode("utf-8")
+    parts = [HISTORY_BINARY_MAGIC, struct.pack("<III", len(labels), len(symbols), len(names)), names]
+    size = 16 + len(names)
+    pad = -size % 4
+    parts.append(b"\0" * pad)
+    size += pad
+
+    days = array("i", [d.toordinal() - _EPOCH_ORDINAL for d in labels])
+    if sys.byteorder != "little":
+        days.byteswap()
+    parts.append(days.tobytes())
+    size += 4 * len(labels)
+    parts.append(b"\0" * (-size % 8))
+
+    for col in columns:
+        if sys.byteorder != "little":
+            col = array("d", col)
+            col.byteswap()
+        parts.append(col.tobytes())
+
+    return b"".join(parts)
+
+
+def _csv_history_batch_compute(
+    csv_path: Path,
+    syms: list[str],
+    start_date: Optional[date],
+    end_date: Optional[date],
+    fmt: str,
+) -> bytes | dict[str, Any]:
+    store = price_store(csv_path)
+
+    # pro Symbol nur den Zeitraum schneiden
+    sliced = {sym: store.rows(sym, start_date, end_date) for sym in syms}
+
+    labels = sorted({d for rows in sliced.values() for d, _ in rows})
+    index = {d: i for i, d in enumerate(labels)}
+
+    columns: list[array] = []
+    for sym in syms:
+        col = array("d", [math.nan]) * len(labels)
+        for d, p in sliced[sym]:
+            col[index[d]] = p
+        columns.append(col)
+
+    if fmt == "binary":
+        return _encode_history_binary(syms, labels, columns)
+
+    return {
+        "labels": [d.isoformat() for d in labels],
+        "series": [
+            {
+                "symbol": sym,
+                "available": bool(sliced[sym]),
+                "data": [None if math.isnan(v) else v for v in col],
+            }
+            for sym, col in zip(syms, columns)
+        ],
+        "csv_used": csv_path.name,
+    }
+
+
+@app.get("/api/csv/history")
+async def csv_history_batch(
+    symbols: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    format: str = "json",
+):
+    """
+    Liefert mehrere Zeitverläufe aus der neuesten CSV in einem Request,
+    ausgerichtet auf eine gemeinsame Datumsachse.
+    ?symbols=BTC,ETH,SOL&start=YYYY-MM-DD&end=YYYY-MM-DD&format=json|binary
+    Fehlende Tage: null (JSON) bzw. NaN (binary, siehe _encode_history_binary).
+    """
+    syms = [s.strip().upper() for s in symbols.split(",") if s and s.strip()]
+    syms = list(dict.fromkeys(syms))
+    if not syms:
+        raise HTTPException(status_code=400, detail="symbols ist leer")
+    if len(syms) > HISTORY_BATCH_MAX_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"Maximal {HISTORY_BATCH_MAX_SYMBOLS} Symbole pro Request")
+
+    fmt = (format or "json").lower()
+    if fmt not in ("json", "binary"):
+        raise HTTPException(status_code=400, detail="format muss json oder binary sein")
+
+    start_date = _parse_iso_day(start, "start")
+    end_date = _parse_iso_day(end, "end")
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start liegt nach end")
+
+    csv_path = latest_prices_csv()
+    result = await _compute_gates["history"].run(
+        _csv_history_batch_compute, csv_path, syms, start_date, end_date, fmt
+    )
+
+    if fmt == "binary":
+        return Response(
+            content=result,
+            media_type="application/octet-stream",
+            headers={"X-CSV-Used": csv_path.name},
+        )
+    return result
+#-------Sparplan----------
+def _simulate_savings_compute(csv_path: Path, symbol: str, years: float, monthly_usd: float) -> dict[str, Any]:
+    rows = price_store(csv_path).rows(symbol)
 
     if not rows:
         return {"result_usd": 0.0}
@@ -649,19 +1158,35 @@ def simulate_savings(payload: Dict[str, Any] = Body(...)):
     }
 
 
-@app.post("/api/simulate/savings_dynamic")
-def simulate_savings_dynamic(payload: Dict[str, Any] = Body(...)):
+@app.post("/api/simulate/savings")
+async def simulate_savings(payload: Dict[str, Any] = Body(...)):
     """
-    Dynamischer Sparplan auf Basis gleitender Durchschnitte.
+    Simuliert einen monatlichen Sparplan (DCA) auf Basis der neuesten CSV.
+    Regeln:
+    - Kauf NUR am 1. des Monats
+    - Fehlt der 1. -> Monat wird übersprungen
+    - Keine Gebühren
     """
+    symbol = payload.get("symbol", "").upper()
+    years = float(payload.get("years", 1))
+    monthly_usd = float(payload.get("monthly_usd", 0))
+
+    if not symbol or monthly_usd <= 0:
+        raise HTTPException(status_code=400, detail="Ungültige Parameter")
+
+    csv_path = latest_prices_csv()
+    return await _compute_gates["simulate"].run(_simulate_savings_compute, csv_path, symbol, years, monthly_usd)
 
-    symbol = payload["symbol"].upper()
-    years = float(payload["years"])
-    monthly_usd = float(payload["monthly_usd"])
-    threshold_pct = float(payload["threshold_pct"]) / 100.0
-    adjust_pct = float(payload["adjust_pct"]) / 100.0
-    ma_days = int(payload["ma_days"])
 
+def _simulate_savings_dynamic_compute(
+    csv_path: Path,
+    symbol: str,
+    years: float,
+    monthly_usd: float,
+    threshold_pct: float,
+    adjust_pct: float,
+    ma_days: int,
+) -> dict[str, Any]:
     print("\n--- DYNAMISCHER SPARPLAN START ---")
     print(f"Symbol: {symbol}")
     print(f"Zeitraum: {years} Jahre")
@@ -671,9 +1196,7 @@ def simulate_savings_dynamic(payload: Dict[str, Any] = Body(...)):
     print(f"Adjust: {adjust_pct * 100:.1f}%")
     print("---------------------------------")
 
-    csv_path = latest_coinbase_csv()
-    prices_by_symbol = load_prices_by_symbol(csv_path)
-    rows = prices_by_symbol.get(symbol)
+    rows = price_store(csv_path).rows(symbol)
 
     if not rows:
         return {"result_usd": 0.0}
@@ -762,3 +1285,1027 @@ def simulate_savings_dynamic(payload: Dict[str, Any] = Body(...)):
     }
 
 
+@app.post("/api/simulate/savings_dynamic")
+async def simulate_savings_dynamic(payload: Dict[str, Any] = Body(...)):
+    """
+    Dynamischer Sparplan auf Basis gleitender Durchschnitte.
+    """
+
+    symbol = payload["symbol"].upper()
+    years = float(payload["years"])
+    monthly_usd = float(payload["monthly_usd"])
+    threshold_pct = float(payload["threshold_pct"]) / 100.0
+    adjust_pct = float(payload["adjust_pct"]) / 100.0
+    ma_days = int(payload["ma_days"])
+
+    csv_path = latest_prices_csv()
+    return await _compute_gates["simulate"].run(
+        _simulate_savings_dynamic_compute,
+        csv_path, symbol, years, monthly_usd, threshold_pct, adjust_pct, ma_days,
+    )
+
+
+# =========================
+# Analytics: Rendite-Heatmap + Einstiegszeitpunkt-Analyse
+# =========================
+ANALYTICS_DEFAULT_HOLD_MONTHS = "1,3,6,12,24,36"
+ANALYTICS_MAX_HOLD_MONTHS = 120
+
+# lebt im API-Prozess (Gate "analytics" läuft in Threads), überdauert also
+# Neustarts des Compute-Pools und wird pro Datenversion nur einmal gebaut
+_returns_cache: dict[str, Any] = {"key": None, "payload": None}
+_returns_lock = threading.Lock()
+
+
+def add_months(d: date, months: int) -> date:
+    """
+    d + months Kalendermonate; Tag wird aufs Monatsende begrenzt (31.01. + 1 -> 28./29.02.).
+    """
+    y, m = divmod(d.month - 1 + months, 12)
+    year, month = d.year + y, m + 1
+    next_first = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return date(year, month, min(d.day, (next_first - timedelta(days=1)).day))
+
+
+def _build_return_series(rows: list[tuple[date, float]]) -> Optional[dict[str, Any]]:
+    """
+    Tägliche Achse ohne Lücken (fehlende Tage = letzter bekannter Preis) und
+    kumulierte Log-Preise: Rendite von Tag i bis j = exp(cum[j] - cum[i]) - 1.
+    Dazu die Monats-/Jahres-Heatmap, die nur die Monatsenden braucht.
+    """
+    rows = [(d, p) for d, p in rows if p > 0]
+    if len(rows) < 2:
+        return None
+
+    first = rows[0][0]
+    n = (rows[-1][0] - first).days + 1
+    cum = array("d", [math.nan]) * n
+    for d, p in rows:
+        cum[(d - first).days] = math.log(p)
+    for i in range(1, n):
+        if math.isnan(cum[i]):
+            cum[i] = cum[i - 1]
+
+    # letzter Index je Monat / Jahr
+    month_end: dict[tuple[int, int], int] = {}
+    year_end: dict[int, int] = {}
+    for i in range(n):
+        d = first + timedelta(days=i)
+        month_end[(d.year, d.month)] = i
+        year_end[d.year] = i
+
+    # Periodenrendite nur, wenn es einen Schlusskurs der Vorperiode gibt
+    # (der angebrochene erste Monat / das erste Jahr bleibt leer)
+    years = sorted(year_end)
+    monthly: dict[int, list[float | None]] = {y: [None] * 12 for y in years}
+    prev = None
+    for (y, m), i in month_end.items():
+        if prev is not None:
+            monthly[y][m - 1] = round((math.exp(cum[i] - cum[prev]) - 1) * 100, 2)
+        prev = i
+
+    annual: dict[int, float | None] = {}
+    prev = None
+    for y in years:
+        i = year_end[y]
+        annual[y] = round((math.exp(cum[i] - cum[prev]) - 1) * 100, 2) if prev is not None else None
+        prev = i
+
+    return {
+        "first": first,
+        "last": rows[-1][0],
+        "cum": cum,
+        "entry": {},
+        "heatmap": {
+            "years": years,
+            "monthly": [monthly[y] for y in years],
+            "annual": [annual[y] for y in years],
+        },
+    }
+
+
+def _entry_returns(series: dict[str, Any], months: int) -> array:
+    """
+    Rendite in % für "Kauf an Tag i, months Monate halten" für alle Tage i (NaN = reicht übers Datenende).
+    Einmal pro Reihe und Haltedauer berechnet, danach nur noch geschnitten.
+    """
+    with _returns_lock:
+        cached = series["entry"].get(months)
+        if cached is not None:
+            return cached
+        out = _build_entry_returns(series, months)
+        series["entry"][months] = out
+        return out
+
+
+def _build_entry_returns(series: dict[str, Any], months: int) -> array:
+    first, cum = series["first"], series["cum"]
+    n = len(cum)
+    out = array("d", [math.nan]) * n
+    for i in range(n):
+        j = (add_months(first + timedelta(days=i), months) - first).days
+        if j >= n:
+            break  # Ziel-Index wächst mit i
+        out[i] = round((math.exp(cum[j] - cum[i]) - 1) * 100, 2)
+    return out
+
+
+def return_series(csv_path: Path, symbol: str) -> Optional[dict[str, Any]]:
+    """
+    Rendite-Reihe eines Symbols, pro Datenversion einmal gebaut und gecacht.
+    """
+    key = prices_version(csv_path)
+    with _returns_lock:
+        if _returns_cache["key"] != key:
+            _returns_cache["key"] = key
+            _returns_cache["payload"] = {}
+
+        by_symbol = _returns_cache["payload"]
+        if symbol not in by_symbol:
+            by_symbol[symbol] = _build_return_series(price_store(csv_path).rows(symbol))
+        return by_symbol[symbol]
+
+
+def _analytics_returns_compute(
+    csv_path: Path,
+    symbol: str,
+    hold_months: list[int],
+    start_date: Optional[date],
+    end_date: Optional[date],
+    step: int,
+) -> dict[str, Any]:
+    series = return_series(csv_path, symbol)
+    if not series:
+        return {"symbol": symbol, "available": False, "csv_used": csv_path.name}
+
+    first, last = series["first"], series["last"]
+    n = len(series["cum"])
+    lo = max(0, (start_date - first).days) if start_date else 0
+    hi = min(n, (end_date - first).days + 1) if end_date else n
+    starts = range(lo, max(lo, hi), step)
+
+    surface: dict[str, list[float | None]] = {}
+    for months in hold_months:
+        values = _entry_returns(series, months)[starts.start:starts.stop:step]
+        surface[str(months)] = [None if math.isnan(v) else v for v in values]
+
+    return {
+        "symbol": symbol,
+        "available": True,
+        "first_date": first.isoformat(),
+        "last_date": last.isoformat(),
+        "heatmap": series["heatmap"],
+        "entry": {
+            "hold_months": hold_months,
+            "start_dates": [(first + timedelta(days=i)).isoformat() for i in starts],
+            "returns_pct": surface,
+        },
+        "csv_used": csv_path.name,
+    }
+
+
+@app.get("/api/analytics/returns/{symbol}")
+async def analytics_returns(
+    symbol: str,
+    hold_months: str = ANALYTICS_DEFAULT_HOLD_MONTHS,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    step: int = 1,
+):
+    """
+    Rendite-Analyse eines Coins aus der neuesten CSV:
+    - heatmap: Monatsrenditen (Jahr x Monat, %) + Jahresrenditen
+    - entry: "Kauf am Tag X, N Monate halten" für alle Starttage in [start, end],
+      jeder step-te Tag. null = Haltedauer reicht über das Datenende hinaus.
+    """
+    try:
+        months = sorted({int(m) for m in hold_months.split(",") if m.strip()})
+    except ValueError:
+        raise HTTPException(status_code=400, detail="hold_months muss eine Liste aus Zahlen sein, z.B. 1,3,12")
+    if not months or months[0] < 1 or months[-1] > ANALYTICS_MAX_HOLD_MONTHS:
+        raise HTTPException(status_code=400, detail=f"hold_months muss zwischen 1 und {ANALYTICS_MAX_HOLD_MONTHS} liegen")
+    if step < 1:
+        raise HTTPException(status_code=400, detail="step muss >= 1 sein")
+
+    start_date = _parse_iso_day(start, "start")
+    end_date = _parse_iso_day(end, "end")
+
+    csv_path = latest_prices_csv()
+    return await _compute_gates["analytics"].run(
+        _analytics_returns_compute, csv_path, symbol.upper(), months, start_date, end_date, step
+    )
+
+
+# =========================
+# Preis-Alerts: Regeln werden pro Tick inkrementell ausgewertet
+# =========================
+ALERT_TICK_SOURCE = os.getenv("ALERT_TICK_SOURCE", "coinbase")  # "coinbase" | "local"
+COINBASE_WS = "wss://ws-feed.exchange.coinbase.com"
+ALERT_WS_RESYNC_SECONDS = 1.0
+ALERT_MAX_MA_DAYS = 1000
+# Kerzengröße für den pct_move-Startwert: kleinste, bei der das Fenster <= 24 Kerzen lang ist
+ALERT_SEED_GRANULARITIES = (60, 300, 900, 3600, 21600, 86400)
+ALERT_TYPES = ("price_above", "price_below", "pct_move", "ma_cross")
+ALERT_CHANGE_SAMPLE_SECONDS = 60
+
+
+class RollingMA:
+    """
+    Gleitender Durchschnitt über die letzten `days` Tagesschlusskurse.
+    Laufende Summe -> O(1) pro Tick. Der letzte Tick eines Tages wird beim
+    Tageswechsel als Schlusskurs übernommen.
+    """
+
+    def __init__(self, days: int, closes: Iterable[tuple[date, float]]):
+        self.days = days
+        self.window: deque[float] = deque()
+        self.total = 0.0
+        self.last_day: Optional[date] = None
+        self.pending: Optional[tuple[date, float]] = None
+        for d, p in closes:
+            self._push(d, p)
+
+    def _push(self, day: date, close: float):
+        self.window.append(close)
+        self.total += close
+        if len(self.window) > self.days:
+            self.total -= self.window.popleft()
+        self.last_day = day
+
+    def update(self, day: date, price: float):
+        # Ticks aus Tagen, die schon in der Historie stecken, ignorieren
+        if self.last_day is not None and day <= self.last_day:
+            return
+        if self.pending is not None and self.pending[0] != day:
+            self._push(*self.pending)
+        self.pending = (day, price)
+
+    @property
+    def value(self) -> float | None:
+        if len(self.window) < self.days:
+            return None
+        return self.total / self.days
+
+
+class RollingChange:
+    """
+    Preisänderung gegenüber dem Preis vor `window_seconds`.
+    Ticks werden auf 1 Sample pro Minute verdichtet; alte Samples fallen vorne raus
+    (amortisiert O(1) pro Tick).
+    """
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self.samples: deque[tuple[float, float]] = deque()
+
+    def update(self, ts: float, price: float):
+        if not self.samples or ts - self.samples[-1][0] >= ALERT_CHANGE_SAMPLE_SECONDS:
+            self.samples.append((ts, price))
+        # samples[0] = jüngstes Sample, das mindestens window_seconds alt ist
+        while len(self.samples) > 1 and ts - self.samples[1][0] >= self.window_seconds:
+            self.samples.popleft()
+
+    def seed(self, ts: float, price: float):
+        """
+        Startwert, damit die Regel nicht erst nach einem vollen Fenster scharf wird.
+        """
+        if not self.samples:
+            self.samples.append((ts, price))
+
+    def pct(self, ts: float, price: float) -> float | None:
+        if not self.samples:
+            return None
+        ref_ts, ref_price = self.samples[0]
+        if ts - ref_ts < self.window_seconds or ref_price <= 0:
+            return None
+        return (price - ref_price) / ref_price * 100
+
+
+class AlertEngine:
+    """
+    Hält alle Regeln, indiziert nach product_id. Ein Tick kostet nur die Regeln
+    dieses Produkts; MA-/Änderungs-State wird pro (Produkt, Parameter) geteilt.
+    Regeln feuern flankengetriggert (beim Überschreiten), nicht bei jedem Tick.
+    Nicht thread-safe: nur vom Event-Loop aus benutzen (alle Alert-Handler sind async).
+    """
+
+    def __init__(self):
+        self.rules: dict[str, dict[str, Any]] = {}
+        self.by_product: dict[str, dict[str, dict[str, Any]]] = {}
+        self.side: dict[str, Optional[bool]] = {}
+        self.ma_state: dict[str, dict[int, RollingMA]] = {}
+        self.change_state: dict[str, dict[float, RollingChange]] = {}
+        self.last_price: dict[str, float] = {}
+        self.subscribers: set[asyncio.Queue] = set()
+
+    def add(
+        self,
+        rule: dict[str, Any],
+        history: Optional[list[tuple[date, float]]] = None,
+        change_seed: Optional[tuple[float, float]] = None,
+    ):
+        pid = rule["product_id"]
+        if rule["type"] == "ma_cross":
+            by_days = self.ma_state.setdefault(pid, {})
+            if rule["ma_days"] not in by_days:
+                by_days[rule["ma_days"]] = RollingMA(rule["ma_days"], history or [])
+        elif rule["type"] == "pct_move":
+            by_window = self.change_state.setdefault(pid, {})
+            if rule["window_hours"] not in by_window:
+                change = by_window[rule["window_hours"]] = RollingChange(rule["window_hours"] * 3600)
+                if change_seed:
+                    change.seed(*change_seed)
+
+        self.rules[rule["id"]] = rule
+        self.by_product.setdefault(pid, {})[rule["id"]] = rule
+        self.side[rule["id"]] = None
+
+    def remove(self, rule_id: str) -> bool:
+        rule = self.rules.pop(rule_id, None)
+        if not rule:
+            return False
+        self.side.pop(rule_id, None)
+
+        pid = rule["product_id"]
+        remaining = self.by_product.get(pid, {})
+        remaining.pop(rule_id, None)
+        if not remaining:
+            self.by_product.pop(pid, None)
+            self.last_price.pop(pid, None)
+
+        # geteilten State nur verwerfen, wenn keine Regel ihn mehr nutzt
+        if rule["type"] == "ma_cross" and not any(
+            r["type"] == "ma_cross" and r["ma_days"] == rule["ma_days"] for r in remaining.values()
+        ):
+            self._drop_state(self.ma_state, pid, rule["ma_days"])
+        if rule["type"] == "pct_move" and not any(
+            r["type"] == "pct_move" and r["window_hours"] == rule["window_hours"] for r in remaining.values()
+        ):
+            self._drop_state(self.change_state, pid, rule["window_hours"])
+        return True
+
+    @staticmethod
+    def _drop_state(states: dict[str, dict[Any, Any]], pid: str, key: Any):
+        by_key = states.get(pid, {})
+        by_key.pop(key, None)
+        if not by_key:
+            states.pop(pid, None)
+
+    def on_tick(self, product_id: str, price: float, ts: float) -> list[dict[str, Any]]:
+        rules = self.by_product.get(product_id)
+        if not rules or price <= 0:
+            return []
+
+        now = datetime.fromtimestamp(ts, tz=timezone.utc)
+        day = now.date()
+        self.last_price[product_id] = price
+
+        # geteilten State des Produkts einmal pro Tick fortschreiben
+        for ma in self.ma_state.get(product_id, {}).values():
+            ma.update(day, price)
+        for change in self.change_state.get(product_id, {}).values():
+            change.update(ts, price)
+
+        events: list[dict[str, Any]] = []
+        for r in rules.values():
+            event = self._evaluate(r, price, ts)
+            if event:
+                r["triggered_count"] += 1
+                r["last_triggered_at"] = iso_z(now)
+                events.append({**event, "rule_id": r["id"], "type": r["type"], "symbol": r["symbol"],
+                               "product_id": product_id, "price": price, "at": iso_z(now)})
+
+        for e in events:
+            self._publish(e)
+        return events
+
+    def _evaluate(self, r: dict[str, Any], price: float, ts: float) -> Optional[dict[str, Any]]:
+        rid = r["id"]
+        t = r["type"]
+
+        if t in ("price_above", "price_below"):
+            above = price > r["threshold"]
+            prev, self.side[rid] = self.side[rid], above
+            if prev is None or prev == above:
+                return None
+            if (t == "price_above") == above:
+                return {"message": f"{r['symbol']} {'über' if above else 'unter'} {r['threshold']:g} USD"}
+            return None
+
+        if t == "ma_cross":
+            ma = self.ma_state[r["product_id"]][r["ma_days"]].value
+            if ma is None:
+                return None
+            above = price >= ma
+            prev, self.side[rid] = self.side[rid], above
+            if prev is None or prev == above:
+                return None
+            return {"ma": round(ma, 8), "direction": "up" if above else "down",
+                    "message": f"{r['symbol']} kreuzt {r['ma_days']}-Tage-GD {'nach oben' if above else 'nach unten'}"}
+
+        if t == "pct_move":
+            change = self.change_state[r["product_id"]][r["window_hours"]].pct(ts, price)
+            if change is None:
+                return None
+            hit = abs(change) >= r["pct"]
+            prev, self.side[rid] = self.side[rid], hit
+            # erneut scharf erst, wenn die Bewegung wieder unter die Schwelle fällt
+            if not hit or prev:
+                return None
+            return {"change_pct": round(change, 2),
+                    "message": f"{r['symbol']} {change:+.2f}% in {r['window_hours']:g}h"}
+
+        return None
+
+    def _publish(self, event: dict[str, Any]):
+        for q in self.subscribers:
+            if q.full():
+                q.get_nowait()
+            q.put_nowait(event)
+
+
+_alert_engine = AlertEngine()
+_alert_ticker: dict[str, Any] = {"task": None}
+
+
+async def _sync_ticker_subscriptions(ws, subscribed: set[str]):
+    wanted = set(_alert_engine.by_product)
+    add, drop = wanted - subscribed, subscribed - wanted
+    if add:
+        await ws.send(json.dumps({"type": "subscribe", "product_ids": sorted(add), "channels": ["ticker"]}))
+    if drop:
+        await ws.send(json.dumps({"type": "unsubscribe", "product_ids": sorted(drop), "channels": ["ticker"]}))
+    subscribed.clear()
+    subscribed.update(wanted)
+
+
+async def _run_alert_ticker():
+    """
+    Coinbase-Exchange-WebSocket (ticker-Channel) für alle Produkte mit aktiven Regeln.
+    Abos folgen den Regeln; bei Verbindungsfehlern wird mit Backoff neu verbunden.
+    Läuft, solange es Regeln gibt.
+    """
+    backoff = 1
+    try:
+        while _alert_engine.by_product:
+            try:
+                async with websockets.connect(COINBASE_WS, ping_interval=20) as ws:
+                    backoff = 1
+                    subscribed: set[str] = set()
+                    while _alert_engine.by_product:
+                        await _sync_ticker_subscriptions(ws, subscribed)
+                        try:
+                            raw = await asyncio.wait_for(ws.recv(), timeout=ALERT_WS_RESYNC_SECONDS)
+                        except asyncio.TimeoutError:
+                            continue
+
+                        msg = json.loads(raw)
+                        if msg.get("type") != "ticker":
+                            continue
+                        try:
+                            price = float(msg["price"])
+                            ts = datetime.fromisoformat(msg["time"]).timestamp()
+                        except (KeyError, TypeError, ValueError):
+                            continue
+                        _alert_engine.on_tick(msg.get("product_id"), price, ts)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+    finally:
+        _alert_ticker["task"] = None
+
+
+async def _seed_ma_history(client: httpx.AsyncClient, product_id: str, ma_days: int) -> list[tuple[date, float]]:
+    """
+    Letzte ma_days Tagesschlusskurse direkt von Coinbase (bis inkl. gestern),
+    damit der GD keine Lücke zwischen Export und Live-Ticks überdeckt.
+    """
+    closes = await cb_daily_closes(client, product_id, years=math.ceil((ma_days + 7) / 365))
+    rows = [(date.fromisoformat(d), c) for d, c in closes]
+    yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+    if not rows or rows[-1][0] < yesterday:
+        raise HTTPException(status_code=502, detail=f"Coinbase liefert keine aktuellen Tageskurse für {product_id}")
+    return rows[-ma_days:]
+
+
+async def _seed_change_reference(client: httpx.AsyncClient, product_id: str, window_hours: float) -> Optional[tuple[float, float]]:
+    """
+    Preis vor window_hours: Schlusskurs der Kerze, die zuletzt vor (now - window) endet.
+    Die Kerzengröße passt zum Fenster; ohne Kerze in höchstens einer Kerzenlänge Abstand kein Startwert.
+    """
+    window_seconds = window_hours * 3600
+    granularity = next((g for g in ALERT_SEED_GRANULARITIES if window_seconds <= g * 24), 86400)
+    ref = datetime.now(timezone.utc) - timedelta(seconds=window_seconds)
+    try:
+        rows = await cb_get_candles(client, product_id, ref - timedelta(seconds=granularity * 3), ref, granularity=granularity)
+    except httpx.HTTPError:
+        return None
+
+    # [time (Kerzenbeginn), low, high, open, close] -> Schlusskurs zum Kerzenende
+    ref_ts = ref.timestamp()
+    closes = [
+        (int(r[0]) + granularity, float(r[4]))
+        for r in rows
+        if isinstance(r, list) and len(r) >= 5 and int(r[0]) + granularity <= ref_ts
+    ]
+    if not closes:
+        return None
+    close_ts, price = max(closes)
+    if ref_ts - close_ts > granularity:
+        return None
+    return (close_ts, price)
+
+
+def _ensure_alert_ticker():
+    if ALERT_TICK_SOURCE != "coinbase":
+        return
+    task = _alert_ticker["task"]
+    if task is None or task.done():
+        _alert_ticker["task"] = asyncio.create_task(_run_alert_ticker())
+
+
+def _public_rule(rule: dict[str, Any]) -> dict[str, Any]:
+    pid = rule["product_id"]
+    out = {**rule, "last_price": _alert_engine.last_price.get(pid)}
+    if rule["type"] == "ma_cross":
+        ma = _alert_engine.ma_state.get(pid, {}).get(rule["ma_days"])
+        out["ma"] = ma.value if ma else None
+    return out
+
+
+@app.post("/api/alerts")
+async def create_alert(payload: Dict[str, Any] = Body(...)):
+    """
+    Body je nach type:
+    - { "type": "price_above" | "price_below", "symbol": "BTC", "threshold": 100000 }
+    - { "type": "pct_move", "symbol": "ETH", "pct": 5, "window_hours": 24 }
+    - { "type": "ma_cross", "symbol": "BTC", "ma_days": 200 }
+    GD und 24h-Referenz werden beim Anlegen aus Coinbase-Tageskursen vorbelegt
+    (mit ALERT_TICK_SOURCE=local: GD aus den gespeicherten Tageskursen, keine 24h-Referenz).
+    """
+    alert_type = payload.get("type")
+    symbol = payload.get("symbol")
+    if alert_type not in ALERT_TYPES:
+        raise HTTPException(status_code=400, detail=f"type muss einer von {', '.join(ALERT_TYPES)} sein")
+    if not isinstance(symbol, str) or not symbol.strip():
+        raise HTTPException(status_code=400, detail="symbol muss ein nicht-leerer String sein")
+    symbol = symbol.strip().upper()
+
+    rule: dict[str, Any] = {
+        "id": uuid.uuid4().hex[:10],
+        "type": alert_type,
+        "symbol": symbol,
+        "product_id": f"{symbol}-USD",
+        "created_at": iso_z(datetime.now(timezone.utc)),
+        "triggered_count": 0,
+        "last_triggered_at": None,
+    }
+    history = None
+
+    try:
+        if alert_type in ("price_above", "price_below"):
+            rule["threshold"] = float(payload["threshold"])
+            if rule["threshold"] <= 0:
+                raise ValueError
+        elif alert_type == "pct_move":
+            rule["pct"] = float(payload["pct"])
+            rule["window_hours"] = float(payload.get("window_hours", 24))
+            if rule["pct"] <= 0 or rule["window_hours"] <= 0:
+                raise ValueError
+        else:
+            rule["ma_days"] = int(payload.get("ma_days", 200))
+            if not 1 <= rule["ma_days"] <= ALERT_MAX_MA_DAYS:
+                raise ValueError
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Ungültige Parameter")
+
+    pid = rule["product_id"]
+    change_seed = None
+
+    if ALERT_TICK_SOURCE == "local":
+        # lokale Ticks bestimmen die Zeitachse selbst -> GD aus den gespeicherten Tageskursen
+        if alert_type == "ma_cross" and rule["ma_days"] not in _alert_engine.ma_state.get(pid, {}):
+            store = await asyncio.to_thread(price_store, latest_prices_csv())
+            rows = store.rows(symbol)
+            if len(rows) < rule["ma_days"]:
+                raise HTTPException(status_code=400, detail=f"Zu wenig Historie für {rule['ma_days']}-Tage-GD")
+            history = rows[-rule["ma_days"]:]
+    else:
+        headers = {"Accept": "application/json", "User-Agent": "onepager-fastapi/alerts"}
+        timeout = httpx.Timeout(30.0, connect=15.0)
+        try:
+            async with httpx.AsyncClient(timeout=timeout, headers=headers) as client:
+                products = await cb_get_products(client)
+                if not any(p.get("id") == pid and p.get("status") == "online" for p in products):
+                    raise HTTPException(status_code=400, detail=f"Kein Coinbase-USD-Paar für {symbol}")
+
+                if alert_type == "ma_cross" and rule["ma_days"] not in _alert_engine.ma_state.get(pid, {}):
+                    history = await _seed_ma_history(client, pid, rule["ma_days"])
+                    if len(history) < rule["ma_days"]:
+                        raise HTTPException(status_code=400, detail=f"Zu wenig Historie für {rule['ma_days']}-Tage-GD")
+                elif alert_type == "pct_move" and rule["window_hours"] not in _alert_engine.change_state.get(pid, {}):
+                    change_seed = await _seed_change_reference(client, pid, rule["window_hours"])
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=502, detail=f"Coinbase error: {e}")
+
+    _alert_engine.add(rule, history, change_seed)
+    _ensure_alert_ticker()
+    return _public_rule(rule)
+
+
+@app.get("/api/alerts")
+async def list_alerts(symbol: Optional[str] = None):
+    if symbol:
+        rules = _alert_engine.by_product.get(f"{symbol.upper()}-USD", {}).values()
+    else:
+        rules = _alert_engine.rules.values()
+    out = [_public_rule(r) for r in rules]
+    return {"count": len(out), "alerts": out, "tick_source": ALERT_TICK_SOURCE}
+
+
+@app.delete("/api/alerts/{rule_id}")
+async def delete_alert(rule_id: str):
+    if not _alert_engine.remove(rule_id):
+        raise HTTPException(status_code=404, detail="Unknown rule_id")
+    return {"deleted": rule_id}
+
+
+@app.post("/api/alerts/ticks")
+async def push_alert_ticks(payload: Dict[str, Any] = Body(...)):
+    """
+    Lokale Tick-Quelle (nur mit ALERT_TICK_SOURCE=local), z.B. für Tests:
+    Body: { "ticks": [{ "symbol": "BTC", "price": 101000.5, "ts": 1768400000 }, ...] }
+    ts (Unix-Sekunden) ist optional, Standard = jetzt.
+    """
+    if ALERT_TICK_SOURCE != "local":
+        raise HTTPException(status_code=409, detail="Ticks nur mit ALERT_TICK_SOURCE=local")
+
+    ticks = payload.get("ticks")
+    if not isinstance(ticks, list):
+        raise HTTPException(status_code=400, detail="ticks muss eine Liste sein")
+
+    events: list[dict[str, Any]] = []
+    for t in ticks:
+        try:
+            pid = t.get("product_id") or f"{t['symbol'].strip().upper()}-USD"
+            price = float(t["price"])
+            ts = float(t.get("ts") or datetime.now(timezone.utc).timestamp())
+        except (AttributeError, KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Ungültiger Tick")
+        events.extend(_alert_engine.on_tick(pid, price, ts))
+
+    return {"ticks": len(ticks), "count": len(events), "events": events}
+
+
+@app.websocket("/ws/alerts")
+async def alerts_ws(websocket: WebSocket):
+    """
+    Schickt jedes ausgelöste Alert-Event als JSON an den Client.
+    """
+    await websocket.accept()
+    q: asyncio.Queue = asyncio.Queue(maxsize=100)
+    _alert_engine.subscribers.add(q)
+    try:
+        while True:
+            await websocket.send_json(await q.get())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        _alert_engine.subscribers.discard(q)
+
+
+# =========================
+# CSV-Import: externe Tages-/OHLC-Historie als Stream einlesen
+# =========================
+IMPORT_MAX_ERROR_SAMPLES = 20
+IMPORT_BATCH_CHARS = 1 << 20  # so viel Text sammeln, bevor ein Block im Thread geparst wird
+IMPORT_DAY_CACHE_MAX = 100_000  # Intraday-Zeitstempel sind fast alle verschieden -> Cache begrenzen
+
+_import_jobs: dict[str, dict[str, Any]] = {}
+_import_lock = asyncio.Lock()
+
+
+def _parse_import_day(value: str) -> date:
+    """
+    Akzeptierte Formate (unabhängig von der Python-Version):
+    - YYYY-MM-DD, optional gefolgt von "T" oder " " + Uhrzeit (Tag = Datumsteil, keine Zeitzonen-Umrechnung)
+    - YYYYMMDD (genau 8 Ziffern)
+    - Unix-Zeit in Sekunden oder Millisekunden (UTC-Tag)
+    Alles andere -> ValueError.
+    """
+    value = value.strip()
+    if len(value) >= 10 and value[4] == "-" and value[7] == "-":
+        if len(value) > 10 and value[10] not in "T ":
+            raise ValueError(value)
+        return date(int(value[:4]), int(value[5:7]), int(value[8:10]))
+    if len(value) == 8 and value.isdigit():
+        return date(int(value[:4]), int(value[4:6]), int(value[6:]))
+    ts = float(value)
+    if ts > 1e11:
+        ts /= 1000
+    return datetime.fromtimestamp(ts, tz=timezone.utc).date()
+
+
+def _mark_day(bits: bytearray, day: int) -> bool:
+    """
+    Setzt das Bit für `day` (Tage seit 1970-01-01); False, wenn es schon gesetzt war.
+    """
+    byte, mask = day >> 3, 1 << (day & 7)
+    if byte >= len(bits):
+        bits.extend(bytes(byte - len(bits) + 64))
+    if bits[byte] & mask:
+        return False
+    bits[byte] |= mask
+    return True
+
+
+def _import_record_cut(text: str) -> int:
+    """
+    Position hinter dem letzten Zeilenende, das nicht in einem gequoteten Feld liegt
+    (0 = noch kein vollständiger Datensatz). `text` beginnt immer an einer Datensatzgrenze,
+    daher liegt ein Zeilenende genau dann außerhalb von Quotes, wenn davor eine gerade Anzahl '"' steht.
+    """
+    cut = text.rfind("\n") + 1
+    while cut and text.count('"', 0, cut) % 2:
+        cut = text.rfind("\n", 0, cut - 1) + 1
+    return cut
+
+
+class CsvImporter:
+    """
+    Verarbeitet eine CSV blockweise: validiert jede Zeile, verwirft (Symbol, Tag)-Duplikate
+    gegen vorhandene Daten und schreibt neue Zeilen im Export-Schema.
+    Mehrere Zeilen pro (Symbol, Tag) innerhalb der Datei (z.B. Intraday-OHLC): letzter gewinnt.
+    Die erste Zeile steht dann schon in der Datei, spätere landen in `overrides` und ersetzen
+    sie beim Mergen (wächst nur mit der Zahl mehrfacher Tage, nicht mit der Zeilenzahl).
+    Bekannte Tage liegen als Bitmap pro Symbol vor (~7 KB pro Symbol statt eines Tupels pro Zeile).
+    """
+
+    def __init__(self, job: dict[str, Any], existing: dict[str, bytearray], writer, mapping: dict[str, Any]):
+        self.job = job
+        self.seen = existing
+        self.in_file: dict[str, bytearray] = {}
+        self.overrides: dict[tuple[str, str], tuple[str, str, str, str, str]] = {}
+        self.writer = writer
+        self.mapping = mapping
+        self.idx: Optional[dict[str, Optional[int]]] = None
+        self.days: dict[str, tuple[int, str]] = {}
+        self.max_day = datetime.now(timezone.utc).date().toordinal() - _EPOCH_ORDINAL + 1
+
+    def header(self, fields: list[str]):
+        names = [f.strip() for f in fields]
+        if names:
+            names[0] = names[0].lstrip("\ufeff")
+
+        def col(name: Optional[str], required: bool) -> Optional[int]:
+            if name and name in names:
+                return names.index(name)
+            if required:
+                raise HTTPException(status_code=400, detail=f"Spalte fehlt: {name}")
+            return None
+
+        self.idx = {
+            "symbol": None if self.mapping["symbol"] else col(self.mapping["symbol_col"], True),
+            "date": col(self.mapping["date_col"], True),
+            "close": col(self.mapping["close_col"], True),
+            "product_id": col(self.mapping["product_id_col"], False),
+            "error": col("error", False),
+        }
+
+    def _invalid(self, line_no: int, reason: str):
+        job = self.job
+        job["invalid"] += 1
+        if len(job["error_samples"]) < IMPORT_MAX_ERROR_SAMPLES:
+            job["error_samples"].append({"line": line_no, "error": reason})
+
+    def feed_text(self, text: str):
+        """
+        Parst einen Block vollständiger Datensätze (läuft im Worker-Thread).
+        """
+        rows = list(csv.reader(io.StringIO(text, newline=""), delimiter=self.mapping["delimiter"]))
+        if self.idx is None:
+            if not rows:
+                return
+            self.header(rows.pop(0))
+        self.feed(rows)
+
+    def feed(self, rows: list[list[str]]):
+        idx = self.idx
+        job = self.job
+        seen = self.seen
+        in_file = self.in_file
+        overrides = self.overrides
+        days = self.days
+        max_day = self.max_day
+        fixed_symbol = self.mapping["symbol"]
+        i_sym, i_date, i_close, i_pid, i_err = (
+            idx["symbol"], idx["date"], idx["close"], idx["product_id"], idx["error"]
+        )
+        line_no = job["rows"] + 1  # +1 für Header
+        skipped = duplicates = replaced = 0
+        out = []
+
+        for row in rows:
+            line_no += 1
+            if not row:
+                continue
+            try:
+                if i_err is not None and row[i_err].strip():
+                    skipped += 1
+                    continue
+                sym = fixed_symbol or row[i_sym].strip().upper()
+                raw_day = row[i_date]
+                parsed = days.get(raw_day)
+                if parsed is None:
+                    # Tage wiederholen sich über alle Symbole -> nur einmal parsen
+                    if len(days) >= IMPORT_DAY_CACHE_MAX:
+                        days.clear()
+                    d = _parse_import_day(raw_day)
+                    parsed = days[raw_day] = (d.toordinal() - _EPOCH_ORDINAL, d.isoformat())
+                day, day_iso = parsed
+                close_str = row[i_close].strip()
+                close = float(close_str)
+            except (IndexError, ValueError, OverflowError, OSError):
+                self._invalid(line_no, "Zeile nicht lesbar")
+                continue
+
+            if not sym or not math.isfinite(close) or close <= 0:
+                self._invalid(line_no, "Symbol oder Preis ungültig")
+                continue
+            if not 0 <= day <= max_day:
+                self._invalid(line_no, "Datum vor 1970 oder in der Zukunft")
+                continue
+
+            known = seen.get(sym)
+            if known is not None and day >> 3 < len(known) and known[day >> 3] & (1 << (day & 7)):
+                duplicates += 1
+                continue
+
+            pid = (row[i_pid].strip() if i_pid is not None and i_pid < len(row) else "") or f"{sym}-USD"
+            new_row = (sym, pid, day_iso, close_str, "")
+            bits = in_file.get(sym)
+            if bits is None:
+                bits = in_file[sym] = bytearray()
+            if _mark_day(bits, day):
+                out.append(new_row)
+            else:
+                overrides[(sym, day_iso)] = new_row
+                replaced += 1
+
+        self.writer.writerows(out)
+        job["rows"] += len(rows)
+        job["imported"] += len(out)
+        job["skipped"] += skipped
+        job["duplicates"] += duplicates
+        job["replaced"] += replaced
+
+
+def _merge_import_file(new_rows_path: Path, overrides: dict[tuple[str, str], tuple[str, str, str, str, str]]):
+    """
+    Hängt die neuen Zeilen an den Import-Bestand an (über eine Kopie + atomares Ersetzen).
+    Zeilen mit Eintrag in `overrides` werden dabei durch die letzte Zeile ihres Tages ersetzt.
+    """
+    merged = IMPORT_PATH.with_name(IMPORT_PATH.name + ".merge")
+    if IMPORT_PATH.exists():
+        shutil.copyfile(IMPORT_PATH, merged)
+    else:
+        with open(merged, "w", encoding="utf-8", newline="") as f:
+            csv.writer(f).writerow(["symbol", "product_id", "date_utc", "close_usd", "error"])
+
+    with open(merged, "a", encoding="utf-8", newline="") as dst, \
+            open(new_rows_path, "r", encoding="utf-8", newline="") as src:
+        src.readline()  # Header nur einmal
+        if not overrides:
+            shutil.copyfileobj(src, dst)
+        else:
+            w = csv.writer(dst)
+            for row in csv.reader(src):
+                w.writerow(overrides.get((row[0], row[2]), row))
+    os.replace(merged, IMPORT_PATH)
+
+
+def _existing_price_days() -> dict[str, bytearray]:
+    """
+    Bereits vorhandene Tage pro Symbol als Bitmap (direkt aus dem gemappten PriceStore).
+    """
+    try:
+        store = price_store(latest_prices_csv())
+    except HTTPException:
+        return {}
+    existing: dict[str, bytearray] = {}
+    for sym, (lo, hi) in store.spans.items():
+        bits = existing[sym] = bytearray()
+        for d in store.days[lo:hi]:
+            if d >= 0:
+                _mark_day(bits, d)
+    return existing
+
+
+@app.post("/api/import/csv")
+async def import_csv(
+    request: Request,
+    symbol: Optional[str] = None,
+    symbol_col: str = "symbol",
+    date_col: str = "date_utc",
+    close_col: str = "close_usd",
+    product_id_col: str = "product_id",
+    delimiter: str = ",",
+    job_id: Optional[str] = None,
+):
+    """
+    Importiert eine CSV als Roh-Body (chunked Upload, z.B. curl -T datei.csv),
+    Standard ist das Export-Schema (symbol, product_id, date_utc, close_usd, error).
+    Andere Dateien über Spaltennamen mappen, z.B. OHLC einer einzelnen Coin:
+    ?symbol=BTC&date_col=time&close_col=close
+    Mehrere Zeilen pro (Symbol, Tag) in der Datei: die letzte zählt (Tagesschluss bei Intraday-Daten).
+    Fortschritt (rows/s) über /api/import/csv/status/{job_id}; job_id kann vorab gewählt werden.
+    """
+    if len(delimiter) != 1:
+        raise HTTPException(status_code=400, detail="delimiter muss genau ein Zeichen sein")
+    if job_id is not None and (not job_id.isalnum() or len(job_id) > 32 or job_id in _import_jobs):
+        raise HTTPException(status_code=400, detail="job_id ungültig oder schon vergeben")
+    if _import_lock.locked():
+        raise HTTPException(status_code=409, detail="Es läuft bereits ein Import")
+
+    async with _import_lock:
+        job_id = job_id or uuid.uuid4().hex[:10]
+        job: dict[str, Any] = {
+            "job_id": job_id,
+            "status": "running",
+            "bytes": 0,
+            "rows": 0,
+            "imported": 0,
+            "duplicates": 0,
+            "replaced": 0,
+            "invalid": 0,
+            "skipped": 0,
+            "rows_per_s": 0.0,
+            "error_samples": [],
+            "fail_reason": None,
+        }
+        _import_jobs[job_id] = job
+
+        new_rows_path = IMPORT_PATH.with_name(f"import_{job_id}.tmp")
+        started = time.monotonic()
+        try:
+            mapping = {
+                "symbol": (symbol or "").strip().upper() or None,
+                "symbol_col": symbol_col,
+                "date_col": date_col,
+                "close_col": close_col,
+                "product_id_col": product_id_col,
+                "delimiter": delimiter,
+            }
+            with open(new_rows_path, "w", encoding="utf-8", newline="") as f:
+                w = csv.writer(f)
+                w.writerow(["symbol", "product_id", "date_utc", "close_usd", "error"])
+                # Parsen + Dedupe im Thread, damit der Event-Loop frei bleibt
+                existing = await asyncio.to_thread(_existing_price_days)
+                importer = CsvImporter(job, existing, w, mapping)
+
+                decoder = codecs.getincrementaldecoder("utf-8")()
+                pending = ""
+                async for chunk in request.stream():
+                    job["bytes"] += len(chunk)
+                    pending += decoder.decode(chunk)
+                    if len(pending) < IMPORT_BATCH_CHARS:
+                        continue
+                    cut = _import_record_cut(pending)
+                    if not cut:
+                        continue
+                    text, pending = pending[:cut], pending[cut:]
+                    await asyncio.to_thread(importer.feed_text, text)
+                    job["rows_per_s"] = round(job["rows"] / max(time.monotonic() - started, 1e-6), 1)
+
+                pending += decoder.decode(b"", final=True)
+                await asyncio.to_thread(importer.feed_text, pending)
+                if importer.idx is None:
+                    raise HTTPException(status_code=400, detail="CSV ist leer")
+
+            if job["imported"]:
+                await asyncio.to_thread(_merge_import_file, new_rows_path, importer.overrides)
+            job["status"] = "done"
+        except HTTPException as e:
+            job["status"] = "failed"
+            job["fail_reason"] = e.detail
+            raise
+        except Exception as e:
+            job["status"] = "failed"
+            job["fail_reason"] = str(e)
+            raise HTTPException(status_code=500, detail=f"Import fehlgeschlagen: {e}")
+        finally:
+            new_rows_path.unlink(missing_ok=True)
+            job["seconds"] = round(time.monotonic() - started, 2)
+            job["rows_per_s"] = round(job["rows"] / max(job["seconds"], 1e-6), 1)
+
+    return job
+
+
+@app.get("/api/import/csv/status/{job_id}")
+def import_csv_status(job_id: str):
+    job = _import_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Unknown job_id")
+    return job